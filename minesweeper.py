@@ -1,5 +1,43 @@
+import functools
 import itertools
 import random
+from collections import deque
+
+
+# Offsets from a cell to each of its eight neighbours
+_OFFSETS = (
+    (-1, -1), (-1, 0), (-1, 1),
+    (0, -1), (0, 1),
+    (1, -1), (1, 0), (1, 1),
+)
+
+
+@functools.lru_cache(maxsize=None)
+def _neighbour_masks(height, width):
+    """
+    Returns the mask of neighbours of every cell on a height x width
+    board, indexed by the cell's bit position. The table is built once
+    per board size and shared by every game of that size.
+    """
+    return tuple(
+        sum(
+            1 << ((i + di) * width + j + dj)
+            for di, dj in _OFFSETS
+            if 0 <= i + di < height and 0 <= j + dj < width
+        )
+        for i in range(height)
+        for j in range(width)
+    )
+
+
+def _bits(mask):
+    """
+    Yields every single-bit mask set in mask, lowest first.
+    """
+    while mask:
+        low = mask & -mask
+        yield low
+        mask ^= low
 
 
 class Minesweeper:
@@ -12,23 +50,23 @@ class Minesweeper:
         # Set initial width, height, and number of mines
         self.height = height
         self.width = width
-        self.mines = set()
 
         # Initialize an empty field with no mines
-        self.board = []
-        for i in range(self.height):
-            row = []
-            for j in range(self.width):
-                row.append(False)
-            self.board.append(row)
+        self.board = [[False] * width for _ in range(height)]
 
         # Add mines randomly
-        while len(self.mines) != mines:
-            i = random.randrange(height)
-            j = random.randrange(width)
-            if not self.board[i][j]:
-                self.mines.add((i, j))
-                self.board[i][j] = True
+        cells = random.sample(range(height * width), mines)
+        self.mines = {divmod(cell, width) for cell in cells}
+        for i, j in self.mines:
+            self.board[i][j] = True
+
+        # Count the mines around every cell once, using the same
+        # neighbour table as the AI
+        mines_mask = sum(1 << cell for cell in cells)
+        self._counts = [
+            (neighbours & mines_mask).bit_count()
+            for neighbours in _neighbour_masks(height, width)
+        ]
 
         # At first, player has found no mines
         self.mines_found = set()
@@ -59,23 +97,8 @@ class Minesweeper:
         not including the cell itself.
         """
 
-        # Keep count of nearby mines
-        count = 0
-
-        # Loop over all cells within one row and column
-        for i in range(cell[0] - 1, cell[0] + 2):
-            for j in range(cell[1] - 1, cell[1] + 2):
-
-                # Ignore the cell itself
-                if (i, j) == cell:
-                    continue
-
-                # Update count if cell in bounds and is mine
-                if 0 <= i < self.height and 0 <= j < self.width:
-                    if self.board[i][j]:
-                        count += 1
-
-        return count
+        i, j = cell
+        return self._counts[i * self.width + j]
 
     def won(self):
         """
@@ -87,62 +110,61 @@ class Minesweeper:
 class Sentence:
     """
     Logical statement about a Minesweeper game
-    A sentence consists of a set of board cells,
+    A sentence consists of a set of board cells, stored as a bitmask,
     and a count of the number of those cells which are mines.
     """
 
-    def __init__(self, cells, count):
-        self.cells = set(cells)
+    __slots__ = ("cells_mask", "count")
+
+    def __init__(self, cells_mask, count):
+        self.cells_mask = cells_mask
         self.count = count
 
     def __eq__(self, other):
-        return self.cells == other.cells and self.count == other.count
+        return self.cells_mask == other.cells_mask and self.count == other.count
 
     def __str__(self):
-        return f"{self.cells} = {self.count}"
+        return f"{self.cells_mask:#x} = {self.count}"
 
     def known_mines(self):
         """
-        Returns the set of all cells in self.cells known to be mines.
+        Returns the mask of all cells in self.cells_mask known to be mines.
         """
 
-        # returns mines or empty set
-        mines = set()
-        if self.count == len(self.cells) and self.count > 0:
-            mines = self.cells
-        return mines
+        # every cell is a mine when count matches the number of cells
+        if self.count == self.cells_mask.bit_count():
+            return self.cells_mask
+        return 0
 
     def known_safes(self):
         """
-        Returns the set of all cells in self.cells known to be safe.
+        Returns the mask of all cells in self.cells_mask known to be safe.
         """
 
         # count is 0 and all cells are safe in this sentence
-        safes = set()
         if self.count == 0:
-            safes = self.cells
-        return safes
+            return self.cells_mask
+        return 0
 
-    def mark_mine(self, cell):
+    def mark_mine(self, mask):
         """
         Updates internal knowledge representation given the fact that
-        a cell is known to be a mine.
+        the cells in mask are known to be mines.
         """
-        # check cell in sentence cells, remove, reduce mines count by 1
-        if cell in self.cells:
-            self.cells.remove(cell)
-            self.count -= 1
-
+        # remove the mines in sentence cells, reduce mines count by as many
+        removed = self.cells_mask & mask
+        self.cells_mask ^= removed
+        self.count -= removed.bit_count()
 
-    def mark_safe(self, cell):
+    def mark_safe(self, mask):
         """
         Updates internal knowledge representation given the fact that
-        a cell is known to be safe.
+        the cells in mask are known to be safe.
         """
 
-        # check cell in sentence cells, remove
-        if cell in self.cells:
-            self.cells.remove(cell)
+        # remove cells from sentence cells
+        self.cells_mask &= ~mask
+
 
 class MinesweeperAI:
     """
@@ -155,71 +177,133 @@ class MinesweeperAI:
         self.height = height
         self.width = width
 
+        # Map each cell to its bit and each bit position back to its cell,
+        # so every cell handed out is one shared tuple object
+        self._cells = [(i, j) for i in range(height) for j in range(width)]
+        self._bit = {cell: 1 << k for k, cell in enumerate(self._cells)}
+        self._all_mask = (1 << (height * width)) - 1
+
         # Keep track of which cells have been clicked on
-        self.moves_made = set()
+        self.moves_made_mask = 0
 
         # Keep track of cells known to be safe or mines
-        self.mines = set()
-        self.safes = set()
-        # List of sentences about the game known to be true
-        self.knowledge = []
+        self.mines_mask = 0
+        self.safes_mask = 0
+        # Sentences about the game known to be true, by sentence id
+        self.knowledge = {}
+        self._next_id = 0
+
+        # Index of the sentence ids containing each cell bit, the sentences
+        # still waiting to be inferred from, and each sentence by its cells
+        self._by_cell = {}
+        self._todo = deque()
+        self._sentence_index = {}
+
+        # Look up the neighbours of every cell on the board, keyed by
+        # the same cell tuples that self._cells hands out
+        self._neighbours = dict(zip(self._cells, _neighbour_masks(height, width)))
+
+    def _to_cells(self, mask):
+        """
+        Yields the (i, j) cell for every bit set in mask.
+        """
+        for bit in _bits(mask):
+            yield self._cells[bit.bit_length() - 1]
+
+    @property
+    def moves_made(self):
+        return set(self._to_cells(self.moves_made_mask))
+
+    @property
+    def mines(self):
+        return set(self._to_cells(self.mines_mask))
+
+    @property
+    def safes(self):
+        return set(self._to_cells(self.safes_mask))
 
     def mark_mine(self, cell):
         """
         Marks a cell as a mine, and updates all knowledge
         to mark that cell as a mine as well.
         """
-        self.mines.add(cell)
-        for sentence in self.knowledge:
-            sentence.mark_mine(cell)
+        self._mark(0, self._bit[cell])
 
     def mark_safe(self, cell):
         """
         Marks a cell as safe, and updates all knowledge
         to mark that cell as safe as well.
         """
-        self.safes.add(cell)
-        for sentence in self.knowledge:
-            sentence.mark_safe(cell)
-            
+        self._mark(self._bit[cell], 0)
+
+    def _mark(self, safes, mines):
+        """
+        Marks every cell in the safes and mines masks, updating each
+        sentence that contains any of them in a single pass.
+        """
+        self.safes_mask |= safes
+        self.mines_mask |= mines
+        # only sentences containing the cells change, so queue them again
+        touched = set()
+        for bit in _bits(safes | mines):
+            touched.update(self._by_cell.pop(bit, ()))
+        for index in touched:
+            sentence = self.knowledge[index]
+            old_mask = sentence.cells_mask
+            sentence.mark_safe(safes)
+            sentence.mark_mine(mines)
+            self._shrunk(index, sentence, old_mask)
+
+    def _shrunk(self, index, sentence, old_mask):
+        """
+        Updates the indexes for a sentence that shrank from old_mask,
+        dropping it from the knowledge base once it has no cells left
+        and queueing it for inference again otherwise.
+        """
+        if self._sentence_index.get(old_mask) is sentence:
+            del self._sentence_index[old_mask]
+        if sentence.cells_mask:
+            self._sentence_index.setdefault(sentence.cells_mask, sentence)
+            self._todo.append(index)
+        else:
+            del self.knowledge[index]
+
+    def _add_sentence(self, sentence):
+        """
+        Adds a sentence to the knowledge base and queues it for inference,
+        unless it is empty or a sentence about the same cells is known.
+        """
+        mask = sentence.cells_mask
+        if not mask or mask in self._sentence_index:
+            return
+        self._sentence_index[mask] = sentence
+        index = self._next_id
+        self._next_id += 1
+        self.knowledge[index] = sentence
+        for bit in _bits(mask):
+            self._by_cell.setdefault(bit, set()).add(index)
+        self._todo.append(index)
+
     def add_knowledge(self, cell, count):
         """
         Called when the Minesweeper board tells us, for a given
         safe cell, how many neighboring cells have mines in them.
         """
         # mark the cell as one of the moves made in the game
-        self.moves_made.add(cell)
+        self.moves_made_mask |= self._bit[cell]
         # mark the cell as a safe cell, updating any sentences that contain the cell as well
         self.mark_safe(cell)
         # add a new sentence to the AI’s knowledge base, based on the value of cell and count, to indicate that count of the cell’s neighbors are mines. 
-        neighbour_cells = set()
-        for i in range(cell[0] - 1, cell[0] + 2):
-            for j in range(cell[1] - 1, cell[1] + 2):
-                if (i, j) == cell:
-                    continue
-                # Only include cells whose state is still undetermined in the sentence
-                if (i, j) in self.safes:
-                    continue
-                if (i, j) in self.mines:
-                    count -= 1
-                    continue
-                if 0 <= i < self.height and 0 <= j < self.width:
-                    neighbour_cells.add((i, j))
-
-        # create new sentence, ignore if empty
-        new_sentence = Sentence(neighbour_cells, count)
-        # add sentence to knowledge
-        self.knowledge.append(new_sentence)
-        # create a copy of knowledge
-        current_knowledge = self.knowledge.copy()
-        # update knowledge
+        # Only include cells whose state is still undetermined in the sentence
+        neighbour_mask = self._neighbours[cell] & ~self.safes_mask
+        count -= (neighbour_mask & self.mines_mask).bit_count()
+        neighbour_mask &= ~self.mines_mask
+
+        # add sentence to knowledge, ignore if empty
+        self._add_sentence(Sentence(neighbour_mask, count))
+        # update knowledge till no new knowledge inferred
         self.update()
 
-        # loop over knowledge and update till no new knowledge inferred
-        while current_knowledge != self.knowledge:
-            current_knowledge = self.knowledge
-            self.update()
-        
     def make_safe_move(self):
         """
         Returns a safe cell to choose on the Minesweeper board.
@@ -229,10 +313,10 @@ class MinesweeperAI:
         This function may use the knowledge in self.mines, self.safes
         and self.moves_made, but should not modify any of those values.
         """
-        for cell in self.safes:
-            if cell not in self.moves_made:
-                return cell
-        return None
+        unplayed = self.safes_mask & ~self.moves_made_mask
+        if not unplayed:
+            return None
+        return self._cells[(unplayed & -unplayed).bit_length() - 1]
 
     def make_random_move(self):
         """
@@ -241,46 +325,52 @@ class MinesweeperAI:
             1) have not already been chosen, and
             2) are not known to be mines
         """
-        available_moves = []
-        for sentence in self.knowledge:
-            for cell in sentence.cells:
-                if cell not in self.moves_made and cell not in self.mines:
-                    available_moves.append(cell)
-        try:
-            return random.choice(available_moves)
-        except IndexError:
+        available_moves = self._all_mask & ~(self.moves_made_mask | self.mines_mask)
+        if not available_moves:
             return None
+        # pick the k-th set bit uniformly at random
+        k = random.randrange(available_moves.bit_count())
+        return next(itertools.islice(self._to_cells(available_moves), k, None))
 
     def update(self):
         """
-        Update knowledge and make new inferences from available knowledge by adding new sentences when possible.
-        """
-        # draw new inferences that weren’t possible before
-     
-        for sentence in self.knowledge:
-            self.safes.update(sentence.known_safes())
-            self.mines.update(sentence.known_mines())
-
-        # If, based on any of the sentences in self.knowledge, new cells can be marked as safe or as mines
-        if self.safes:
-            for safe in self.safes:
-                self.mark_safe(safe)
-        if self.mines:
-            for mine in self.mines:
-                self.mark_mine(mine)
-        # If, based on any of the sentences in self.knowledge, new sentences can be inferred, then those sentences should be added to the knowledge base as well
-        # Remove any empty sentences from knowledge base:
-        empty = Sentence(set(), 0)
-
-        self.knowledge[:] = [x for x in self.knowledge if x != empty]
-        for current_sentence in self.knowledge:
-            for next_sentence in self.knowledge:
-                if current_sentence != next_sentence and current_sentence.cells.issubset(next_sentence.cells):
-                    new_cells = next_sentence.cells - current_sentence.cells
-                    new_count = next_sentence.count - current_sentence.count
-                    new_sentence = Sentence(new_cells, new_count)
-                    if new_sentence not in self.knowledge:
-                        self.knowledge.append(new_sentence)
-
-
-            
\ No newline at end of file
+        Update knowledge and make new inferences from the queued sentences,
+        adding new sentences when possible, until the queue is empty.
+        """
+        while self._todo:
+            index = self._todo.popleft()
+            sentence = self.knowledge.get(index)
+            if sentence is None:
+                continue
+            mask = sentence.cells_mask
+
+            # If the sentence settles its cells, mark the newly discovered
+            # ones as safe or as mines
+            new_safes = sentence.known_safes() & ~self.safes_mask
+            new_mines = sentence.known_mines() & ~self.mines_mask
+            if new_safes or new_mines:
+                self._mark(new_safes, new_mines)
+                continue
+
+            # Otherwise compare it with every sentence sharing a cell with it,
+            # and infer new sentences when one is a subset of the other
+            by_cell = self._by_cell
+            candidates = set().union(*(by_cell[bit] for bit in _bits(mask)))
+            candidates.discard(index)
+            knowledge = self.knowledge
+            sentence_index = self._sentence_index
+            count = sentence.count
+            for other_index in candidates:
+                other = knowledge[other_index]
+                other_mask = other.cells_mask
+                common = mask & other_mask
+                if common == mask:
+                    new_mask = other_mask ^ mask
+                    new_count = other.count - count
+                elif common == other_mask:
+                    new_mask = mask ^ other_mask
+                    new_count = count - other.count
+                else:
+                    continue
+                if new_mask and new_mask not in sentence_index:
+                    self._add_sentence(Sentence(new_mask, new_count))